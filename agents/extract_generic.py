@@ -1,8 +1,8 @@
 from pathlib import Path
-import json, os, pandas as pd, logging
-from jinja2 import Template
+import json, os, orjson, pandas as pd, logging
 from agents.registry import register_extractor
-from llm_client import apply_provider
+from agents.prompt import load_template
+from llm_client import apply_provider_async, chat_completion, run_sync
 from logging.handlers import TimedRotatingFileHandler
 
 # -------------------- 日志兜底初始化（仅当外部未配置时） --------------------
@@ -46,8 +46,20 @@ TYPE_MAP = {
     "array[string]": {"type": "array", "items": {"type": "string"}},
 }
 
+def _tsv_field(v) -> str:
+    # 单元格内的制表符 / 换行替换为空格，TSV 无需引号转义
+    return str(v).replace("\t", " ").replace("\r\n", " ").replace("\n", " ").replace("\r", " ")
+
 def df_to_text(df: pd.DataFrame) -> str:
-    return df.to_csv(index=False)
+    """
+    DataFrame → TSV 文本（空值写成空串）。
+    比 CSV 少了引号转义，prompt token 更少；小表直接 join，省掉 pandas writer 的固定开销。
+    """
+    vals = df.to_numpy(dtype=object, copy=True)   # copy：下面原地填空值，不能改到原 df
+    vals[pd.isna(vals)] = ""
+    lines = ["\t".join(_tsv_field(c) for c in df.columns)]
+    lines.extend("\t".join(_tsv_field(v) for v in row) for row in vals)
+    return "\n".join(lines) + "\n"
 
 def _truncate(txt: str, limit: int = 4000) -> str:
     return txt if len(txt) <= limit else (txt[:limit] + "\n...[truncated]")
@@ -60,6 +72,13 @@ def _pp_json(obj, limit: int = 20000) -> str:
         s = str(obj)
     return s if len(s) <= limit else s[:limit] + "\n...[truncated]"
 
+def _json_object(resp) -> dict:
+    """chat_completion 的缓存校验：结构化输出应是完整的 JSON 对象，截断 / 非对象时抛错不缓存"""
+    obj = orjson.loads(resp.choices[0].message.content)
+    if not isinstance(obj, dict):
+        raise ValueError(f"期望 JSON 对象，实际为 {type(obj).__name__}")
+    return obj
+
 def _kv_summary(d: dict, maxlen: int = 300) -> str:
     """将 {a:1,b:2,...} 压成 "a=1, b=2, ..."，并控制最大长度"""
     parts = [f"{k}={d[k]}" for k in d]
@@ -94,56 +113,148 @@ class GenericExtractor:
         self.keys        = keys
         self.prompt_path = Path(prompt_path)
         self.sheet_name  = sheet_name or "UNKNOWN"
-        provider         = provider or os.getenv("LLM_PROVIDER", "openai")
-        self.client, self.model_name = apply_provider(provider, config_dir)
+        self.provider    = provider or os.getenv("LLM_PROVIDER", "openai")
+        self.config_dir  = config_dir
+        _, self.model_name = apply_provider_async(self.provider, config_dir)
+        # keys 不变，Schema / response_format 只构建一次
+        self._schema     = self._build_schema()
+        self._response_format = {"type": "json_schema", "json_schema": self._schema}
+
+    @property
+    def client(self):
+        # 每次从 llm_client 缓存取：close_clients() 之后按需重建，不会用到已关闭的连接池
+        return apply_provider_async(self.provider, self.config_dir)[0]
 
     # ---------- helpers ----------
     def _build_schema(self):
         props = {k: TYPE_MAP.get(t, {"type": "string"}) for k, t in self.keys.items()}
         return {
             "name": "extract",
-            "parameters": {"type": "object",
-                           "properties": props,
-                           "required": list(props)}
+            "strict": True,
+            "schema": {"type": "object",
+                       "properties": props,
+                       "required": list(props),
+                       "additionalProperties": False}
         }
 
     def _render_prompt(self) -> str:
-        tpl = Template(self.prompt_path.read_text(encoding="utf-8"))
+        tpl = load_template(self.prompt_path)
         return tpl.render(table=df_to_text(self.df), keys=list(self.keys))
 
     # ---------- public ----------
     def extract(self) -> dict:
+        """同步入口（单独调用/调试用）；流水线内请使用 aextract 并发调度"""
+        return run_sync(self.aextract())
+
+    async def aextract(self) -> dict:
         prompt  = self._render_prompt()
-        schema  = self._build_schema()
+        schema  = self._schema
 
         # 【配置级】记录融合后的提示词 & Schema（注意可能包含敏感数据）
         CONFIG_LOG.debug(f"[EXTRACT-PROMPT] sheet={self.sheet_name}, model={self.model_name}\n{_truncate(prompt)}")
         CONFIG_LOG.debug(f"[EXTRACT-SCHEMA]  sheet={self.sheet_name} keys={list(self.keys)} schema={schema}")
 
-        tools = [{"type": "function", "function": schema}]
-        tool_choices = {"type": "function", "function": {"name": "extract"}}
-
         SYS_LOG.info(f"调用抽取 LLM：sheet={self.sheet_name}, model={self.model_name}")  # 【系统级】
 
-        resp = self.client.chat.completions.create(
-            model        = self.model_name,
-            messages     = [{"role": "system", "content": prompt}],
-            tools        = tools,
-            tool_choice  = tool_choices,
+        resp = await chat_completion(
+            self.client,
+            model           = self.model_name,
+            messages        = [{"role": "system", "content": prompt}],
+            response_format = self._response_format,
+            validate        = _json_object,
         )
 
-        # 返回第一个工具调用的参数
-        if resp.choices[0].message.tool_calls:
-            for tool_call in resp.choices[0].message.tool_calls:
-                arguments = json.loads(tool_call.function.arguments)
+        # 结构化输出：message.content 即符合 Schema 的 JSON
+        content = resp.choices[0].message.content
+        if content:
+            arguments = orjson.loads(content)
 
-                # ✅【配置级】记录“完整变量值 JSON”
-                CONFIG_LOG.debug(f"[EXTRACT-VALUES] sheet={self.sheet_name}\n{_pp_json(arguments)}")
+            # ✅【配置级】记录“完整变量值 JSON”
+            CONFIG_LOG.debug(f"[EXTRACT-VALUES] sheet={self.sheet_name}\n{_pp_json(arguments)}")
 
-                # ✅【用户级】记录“变量摘要”便于快速查阅
-                USER_LOG.info(f"[抽取完成] {self.sheet_name} → {_kv_summary(arguments)}")
-                return arguments
+            # ✅【用户级】记录“变量摘要”便于快速查阅
+            USER_LOG.info(f"[抽取完成] {self.sheet_name} → {_kv_summary(arguments)}")
+            return arguments
 
-        # 若没有 tool_calls（极少见），给出系统日志
-        SYS_LOG.warning(f"抽取无返回 tool_calls：sheet={self.sheet_name}")
+        # 若没有返回内容（极少见，如被拒答），给出系统日志
+        SYS_LOG.warning(f"抽取无返回内容：sheet={self.sheet_name}")
         return {}
+
+@register_extractor
+class BatchExtractor:
+    """
+    多个 GenericExtractor（同 provider 的小 Sheet）→ 一次调用 → {sheet: JSON}
+    每个 Sheet 的 prompt 以 "### SHEET: <name>" 分隔拼接，Schema 按 Sheet 名嵌套。
+    批次越大单次延迟越高，只建议合并表格较小的 Sheet。
+    """
+
+    def __init__(self, extractors: list[GenericExtractor]):
+        if not extractors:
+            raise ValueError("BatchExtractor 至少需要一个 extractor")
+        self.extractors = extractors
+        self.sheet_names = [ex.sheet_name for ex in extractors]
+        self.model_name  = extractors[0].model_name
+        self._schema     = self._build_schema()
+        self._response_format = {"type": "json_schema", "json_schema": self._schema}
+
+    @property
+    def client(self):
+        return self.extractors[0].client
+
+    # ---------- helpers ----------
+    def _build_schema(self):
+        props = {ex.sheet_name: ex._schema["schema"] for ex in self.extractors}
+        return {
+            "name": "extract",
+            "strict": True,
+            "schema": {"type": "object",
+                       "properties": props,
+                       "required": list(props),
+                       "additionalProperties": False}
+        }
+
+    def _render_prompt(self) -> str:
+        head = (f"下面包含 {len(self.extractors)} 个 Sheet 的抽取任务，请逐个独立完成，"
+                f"以一个 JSON 对象一次性返回，顶层键为 Sheet 名：{', '.join(self.sheet_names)}。")
+        parts = [f"### SHEET: {ex.sheet_name}\n{ex._render_prompt()}" for ex in self.extractors]
+        return "\n\n".join([head, *parts])
+
+    # ---------- public ----------
+    def extract(self) -> dict[str, dict]:
+        """同步入口（单独调用/调试用）；流水线内请使用 aextract 并发调度"""
+        return run_sync(self.aextract())
+
+    async def aextract(self) -> dict[str, dict]:
+        prompt  = self._render_prompt()
+        schema  = self._schema
+        batch   = ",".join(self.sheet_names)
+
+        CONFIG_LOG.debug(f"[EXTRACT-PROMPT] sheets={batch}, model={self.model_name}\n{_truncate(prompt)}")
+        CONFIG_LOG.debug(f"[EXTRACT-SCHEMA]  sheets={batch} schema={schema}")
+
+        SYS_LOG.info(f"调用批量抽取 LLM：sheets={batch}, model={self.model_name}")
+
+        resp = await chat_completion(
+            self.client,
+            model           = self.model_name,
+            messages        = [{"role": "system", "content": prompt}],
+            response_format = self._response_format,
+            validate        = _json_object,
+        )
+
+        content = resp.choices[0].message.content
+        if content:
+            arguments = orjson.loads(content)
+            out: dict[str, dict] = {}
+            for name in self.sheet_names:
+                values = arguments.get(name)
+                if not isinstance(values, dict):
+                    SYS_LOG.warning(f"批量抽取缺少 Sheet 结果：sheet={name}")
+                    values = {}
+                CONFIG_LOG.debug(f"[EXTRACT-VALUES] sheet={name}\n{_pp_json(values)}")
+                USER_LOG.info(f"[抽取完成] {name} → {_kv_summary(values)}")
+                out[name] = values
+            return out
+
+        SYS_LOG.warning(f"批量抽取无返回内容：sheets={batch}")
+        return {name: {} for name in self.sheet_names}
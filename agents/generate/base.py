@@ -1,7 +1,8 @@
 import os, logging
-from jinja2 import Template
+from pathlib import Path
 from agents.registry import register_generator
-from llm_client import apply_provider
+from agents.prompt import load_template
+from llm_client import apply_provider_async, chat_completion, run_sync
 from logging.handlers import TimedRotatingFileHandler
 
 # -------------------- 日志兜底初始化（仅当外部未配置时） --------------------
@@ -51,19 +52,30 @@ class GenericParagraphGenerator:
         self.prompt_path  = prompt_path
         self.context      = context                 # 这里通常是 extracted（变量命名空间）
         self.paragraph_id = paragraph_id or "UNKNOWN"
-        provider          = provider or os.getenv("LLM_PROVIDER", "openai")
-        self.client, self.model_name = apply_provider(provider, config_dir)
+        self.provider     = provider or os.getenv("LLM_PROVIDER", "openai")
+        self.config_dir   = Path(config_dir)
+        _, self.model_name = apply_provider_async(self.provider, self.config_dir)
+
+    @property
+    def client(self):
+        # 每次从 llm_client 缓存取：close_clients() 之后按需重建，不会用到已关闭的连接池
+        return apply_provider_async(self.provider, self.config_dir)[0]
 
     # ---------- core ----------
     def generate(self) -> str:
-        prompt = Template(open(self.prompt_path, encoding="utf-8").read()).render(**self.context)
+        """同步入口（单独调用/调试用）；流水线内请使用 agenerate 并发调度"""
+        return run_sync(self.agenerate())
+
+    async def agenerate(self) -> str:
+        prompt = load_template(self.prompt_path).render(**self.context)
 
         # ✅【配置级】记录融合后的生成 Prompt
         CONFIG_LOG.debug(f"[GEN-PROMPT] pid={self.paragraph_id}, model={self.model_name}\n{_truncate(prompt)}")
 
         SYS_LOG.info(f"调用生成 LLM：pid={self.paragraph_id}, model={self.model_name}")  # 【系统级】
 
-        resp = self.client.chat.completions.create(
+        resp = await chat_completion(
+            self.client,
             model    = self.model_name,
             messages = [{"role": "system", "content": prompt}]
         )
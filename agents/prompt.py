@@ -0,0 +1,14 @@
+# agents/prompt.py
+"""Prompt 模板加载：按 (路径, mtime) 缓存编译后的 Jinja Template"""
+from functools import lru_cache
+from pathlib import Path
+from jinja2 import Template
+
+@lru_cache(maxsize=128)
+def _load_template(path_str: str, mtime: float) -> Template:
+    return Template(Path(path_str).read_text(encoding="utf-8"))
+
+def load_template(path: str | Path) -> Template:
+    """同一 prompt 文件只读盘、编译一次；文件被修改（mtime 变化）后自动重新加载"""
+    p = Path(path)
+    return _load_template(str(p), p.stat().st_mtime)
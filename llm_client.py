@@ -1,12 +1,64 @@
 # llm_client.py
-import os, yaml, openai
+import os, yaml, openai, json, hashlib, logging, asyncio
+import diskcache, httpx
 from pathlib import Path
+from typing import Any, Callable
+from openai.types.chat import ChatCompletion
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+SYS_LOG = logging.getLogger("system")
+
+# 并发上限（同时在途的 LLM 请求数），按厂商 RPM 配额调整。
+# asyncio.Semaphore 会绑定首次等待它的事件循环，因此每轮运行结束时由 close_clients() 重建
+def _new_limiter() -> asyncio.Semaphore:
+    return asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "16")))
+
+limiter = _new_limiter()
 
 # provider → (client, model_name)
 _clients: dict[str, tuple[openai.OpenAI, str]] = {}
+_async_clients: dict[str, tuple["openai.AsyncOpenAI | BatchClient", str]] = {}
+
+# 所有异步客户端共享一个 HTTP/2 连接池，并发请求复用 TCP/TLS 连接；流水线结束时 close_clients()
+_http_client: httpx.AsyncClient | None = None
+
+def _shared_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2   = True,
+            limits  = httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout = httpx.Timeout(600.0, connect=10.0),   # 长段落生成可能很慢，读超时与 openai 默认一致
+        )
+    return _http_client
+
+async def close_clients():
+    """关闭共享连接池，清空异步客户端缓存与本轮去重表，重建 limiter（下次 apply_provider_async 会重建客户端）"""
+    global _http_client, limiter
+    _async_clients.clear()
+    limiter = _new_limiter()
+    _inflight.clear()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def run_sync(coro):
+    """同步入口用：在新事件循环中执行 coro，结束后 close_clients()，避免连接池 / limiter 残留到已关闭的循环"""
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await close_clients()
+    return asyncio.run(_main())
+
+def _provider_cfg(name: str, config_dir: Path) -> dict:
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)   # 有 libyaml 时用 C 实现
+    _CFG = yaml.load((config_dir / "business_configs" / "llm.yaml").read_text(encoding="utf-8"), Loader=loader)
+    if name not in _CFG:
+        raise KeyError(f"provider {name!r} not in {config_dir.name}/configs/llm.yaml")
+    return _CFG[name]
 
 def apply_provider(name: str = "openai", config_dir: Path = Path("")) -> tuple[openai.OpenAI, str]:
-    _CFG = yaml.safe_load((config_dir / "business_configs" / "llm.yaml").read_text(encoding="utf-8"))
     """
     返回 (client, model_name) 供调用。
     - client  已按 base_url / key / extra 初始化
@@ -16,10 +68,7 @@ def apply_provider(name: str = "openai", config_dir: Path = Path("")) -> tuple[o
     if name in _clients:
         return _clients[name]
 
-    if name not in _CFG:
-        raise KeyError(f"provider {name!r} not in {config_dir.name}/configs/llm.yaml")
-
-    cfg       = _CFG[name]
+    cfg       = _provider_cfg(name, config_dir)
     api_key   = os.getenv(cfg["key_env"], "")
     base_url  = cfg.get("base_url")
     extra     = cfg.get("extra", {})
@@ -28,3 +77,240 @@ def apply_provider(name: str = "openai", config_dir: Path = Path("")) -> tuple[o
     _clients[name] = (client, cfg["model_name"])
     print(f"✓ LLM provider loaded: {name} ({cfg['model_name']})")
     return _clients[name]
+
+def apply_provider_async(name: str = "openai", config_dir: Path = Path("")) -> tuple["openai.AsyncOpenAI | BatchClient", str]:
+    """
+    apply_provider 的异步版本：返回 (AsyncOpenAI, model_name)，供 asyncio 并发调用。
+    llm.yaml 中 batch: true 的 provider 返回 BatchClient（走 Batch API，离线更便宜）。
+    缓存在 _async_clients，与同步客户端互不影响。
+    """
+    if name in _async_clients:
+        return _async_clients[name]
+
+    cfg       = _provider_cfg(name, config_dir)
+    api_key   = os.getenv(cfg["key_env"], "")
+    base_url  = cfg.get("base_url")
+    extra     = cfg.get("extra", {})
+
+    # 实时调用的重试全部交给 tenacity（见 _create，覆盖 SDK 默认的重试范围）：SDK 自带重试会在 limiter 内退避并叠加重试次数。
+    # Batch 的文件上传 / 轮询不经过 _create，保留 SDK 默认重试
+    retries = {} if cfg.get("batch") else {"max_retries": 0}
+    client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=_shared_http_client(),
+                                **{**retries, **extra})
+    if cfg.get("batch"):
+        client = BatchClient(
+            client,
+            completion_window = cfg.get("completion_window", "24h"),
+            poll_interval     = float(cfg.get("poll_interval", 30)),
+            flush_delay       = float(cfg.get("flush_delay", 2)),
+        )
+    _async_clients[name] = (client, cfg["model_name"])
+    print(f"✓ LLM provider loaded (async{', batch' if cfg.get('batch') else ''}): {name} ({cfg['model_name']})")
+    return _async_clients[name]
+
+# ───── Batch API（非交互的离线报告） ─────────────────────────
+_BATCH_ENDPOINT = "/v1/chat/completions"
+_BATCH_DONE     = ("completed", "failed", "expired", "cancelled")
+
+class BatchClient:
+    """
+    把 chat.completions 请求攒成一个 Batch 任务：
+      create() 入队并返回 Future → 静默 flush_delay 秒无新请求后上传 JSONL、
+      batches.create → 每 poll_interval 秒轮询 → 下载结果按 custom_id 回填。
+    同一时刻发起的请求（如全部 Sheet 抽取、依赖就绪后的全部段落生成）自然落在同一批。
+    """
+
+    def __init__(self, client: openai.AsyncOpenAI, completion_window: str = "24h",
+                 poll_interval: float = 30, flush_delay: float = 2):
+        self.client            = client
+        self.base_url          = client.base_url
+        self.completion_window = completion_window
+        self.poll_interval     = poll_interval
+        self.flush_delay       = flush_delay
+        self._pending: list[tuple[str, dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+        self._seq = 0
+
+    async def create(self, **kwargs) -> ChatCompletion:
+        loop = asyncio.get_running_loop()
+        fut  = loop.create_future()
+        self._seq += 1
+        self._pending.append((f"req-{self._seq}", kwargs, fut))
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_later(self.flush_delay, self._flush)
+        return await fut
+
+    def _flush(self):
+        pending, self._pending, self._timer = self._pending, [], None
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._run(pending))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, pending: list[tuple[str, dict, asyncio.Future]]):
+        futs = {cid: fut for cid, _, fut in pending}
+        try:
+            lines = [
+                json.dumps({"custom_id": cid, "method": "POST", "url": _BATCH_ENDPOINT, "body": body},
+                           ensure_ascii=False)
+                for cid, body, _ in pending
+            ]
+            upload = await self.client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+            batch = await self.client.batches.create(
+                input_file_id=upload.id, endpoint=_BATCH_ENDPOINT, completion_window=self.completion_window)
+            SYS_LOG.info(f"已提交 Batch 任务：id={batch.id}, 请求数={len(pending)}")
+
+            while batch.status not in _BATCH_DONE:
+                await asyncio.sleep(self.poll_interval)
+                batch = await self.client.batches.retrieve(batch.id)
+            SYS_LOG.info(f"Batch 任务结束：id={batch.id}, status={batch.status}")
+
+            if batch.output_file_id:
+                content = await self.client.files.content(batch.output_file_id)
+                for line in content.text.splitlines():
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    fut = futs.pop(rec.get("custom_id"), None)
+                    if fut is None or fut.done():
+                        continue
+                    resp = rec.get("response") or {}
+                    if resp.get("status_code") == 200:
+                        fut.set_result(ChatCompletion.model_validate(resp["body"]))
+                    else:
+                        fut.set_exception(RuntimeError(f"Batch 请求失败：{rec.get('error') or resp}"))
+
+            # 没有出现在输出文件里的请求（失败 / 过期）统一报错
+            for fut in futs.values():
+                if not fut.done():
+                    fut.set_exception(RuntimeError(f"Batch 任务 {batch.id} 未返回结果（status={batch.status}）"))
+        except Exception as e:
+            for fut in futs.values():
+                if not fut.done():
+                    fut.set_exception(e)
+
+# ───── 响应缓存（精确匹配） ─────────────────────────────────
+# 相同 (base_url, model, messages, tools, …) 的请求直接返回上次结果，便于反复调 Prompt 时重跑。
+# LLM_CACHE=0 关闭；LLM_CACHE_DIR 指定目录（默认项目根目录下 .llm_cache）
+_cache: diskcache.Cache | None = None
+
+def _response_cache() -> diskcache.Cache | None:
+    global _cache
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        _cache = diskcache.Cache(os.getenv("LLM_CACHE_DIR", str(Path(__file__).parent / ".llm_cache")))
+    return _cache
+
+def _request_key(client, kwargs: dict) -> str:
+    payload = {"base_url": str(client.base_url), **kwargs}
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# ───── 限流 + 失败重试 ─────────────────────────────────────
+_backoff = wait_exponential(multiplier=1, min=1, max=60)
+
+_MAX_RETRY_AFTER = 60.0   # retry-after 上限（秒），避免配额类 429 一次睡上一小时
+
+def _is_retryable(exc: BaseException) -> bool:
+    """与 openai SDK 默认重试范围一致：连接错误 / 超时、408、409、429、5xx"""
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code in (408, 409)
+
+def _wait_retry_after(retry_state) -> float:
+    """优先遵循响应头里的 retry-after（秒，最多 _MAX_RETRY_AFTER），没有则指数退避"""
+    exc  = retry_state.outcome.exception()
+    resp = getattr(exc, "response", None)
+    try:
+        return min(float(resp.headers["retry-after"]), _MAX_RETRY_AFTER)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return _backoff(retry_state)
+
+def _log_retry(retry_state):
+    exc = retry_state.outcome.exception()
+    SYS_LOG.warning(f"LLM 调用失败（{type(exc).__name__}: {exc}），第 {retry_state.attempt_number} 次重试前等待 {retry_state.next_action.sleep:.1f}s")
+
+@retry(
+    retry        = retry_if_exception(_is_retryable),
+    wait         = _wait_retry_after,
+    stop         = stop_after_attempt(6),
+    before_sleep = _log_retry,
+    reraise      = True,
+)
+async def _create(client: openai.AsyncOpenAI, **kwargs) -> ChatCompletion:
+    # 客户端 max_retries=0，所有可重试错误的退避只发生在 tenacity 这一层、limiter 之外，不占并发名额
+    async with limiter:
+        return await client.chat.completions.create(**kwargs)
+
+async def _send(client, **kwargs) -> ChatCompletion:
+    # Batch 请求由服务端排队，不占本地并发名额，也不走 tenacity 重试
+    if isinstance(client, BatchClient):
+        return await client.create(**kwargs)
+    return await _create(client, **kwargs)
+
+def _cacheable(resp: ChatCompletion, validate: Callable[[ChatCompletion], Any] | None) -> bool:
+    """只缓存正常结束且内容可用的响应：截断（length）/ 过滤 / 空内容 / 调用方校验失败的都不落盘"""
+    if not resp.choices:
+        return False
+    for ch in resp.choices:
+        if ch.finish_reason not in ("stop", "tool_calls"):
+            return False
+        if not (ch.message.content or ch.message.tool_calls):
+            return False
+    if validate is None:
+        return True
+    try:
+        validate(resp)
+    except Exception as e:
+        SYS_LOG.debug(f"LLM 响应未通过调用方校验：{type(e).__name__}: {e}")
+        return False
+    return True
+
+async def _cached_send(client, key: str, kwargs: dict,
+                       validate: Callable[[ChatCompletion], Any] | None) -> ChatCompletion:
+    cache = _response_cache()
+    if cache is None:
+        return await _send(client, **kwargs)
+
+    hit = cache.get(key)
+    if hit is not None:
+        SYS_LOG.info(f"命中 LLM 缓存：model={kwargs.get('model')}, key={key[:12]}")
+        return ChatCompletion.model_validate(hit)
+
+    resp = await _send(client, **kwargs)
+    if _cacheable(resp, validate):
+        cache.set(key, resp.model_dump())
+    else:
+        SYS_LOG.warning(f"LLM 响应不可用（截断 / 空内容 / 校验失败），未写入缓存：model={kwargs.get('model')}, "
+                        f"finish_reason={[ch.finish_reason for ch in resp.choices]}, key={key[:12]}")
+    return resp
+
+# 本轮运行内的相同请求只发一次：后来者直接等待同一个 Task（close_clients 时清空）
+_inflight: dict[str, asyncio.Task] = {}
+
+def _drop_failed(key: str, task: asyncio.Task):
+    if task.cancelled() or task.exception() is not None:
+        _inflight.pop(key, None)   # 失败不复用，后续相同请求可以重新发起
+
+async def chat_completion(client: openai.AsyncOpenAI | BatchClient, *,
+                          validate: Callable[[ChatCompletion], Any] | None = None,
+                          **kwargs) -> ChatCompletion:
+    """
+    client.chat.completions.create 的带缓存、去重、限流、失败重试版本；其余参数原样透传。
+    validate：可选的响应校验（抛异常即视为不可用），只有通过校验的响应才写入缓存；
+              校验失败时响应仍原样返回，由调用方按原有逻辑报错。
+    """
+    key  = _request_key(client, kwargs)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_cached_send(client, key, kwargs, validate))
+        task.add_done_callback(lambda t: _drop_failed(key, t))
+        _inflight[key] = task
+    else:
+        SYS_LOG.info(f"复用本轮相同的 LLM 请求：model={kwargs.get('model')}, key={key[:12]}")
+    # shield：某个调用方被取消时不影响其他等待同一结果的调用方
+    return await asyncio.shield(task)
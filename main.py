@@ -11,15 +11,19 @@
 
 from __future__ import annotations
 
-import os, sys, yaml, pandas as pd, json, traceback
+import os, sys, json, math, traceback, asyncio
+import orjson
 from pathlib import Path
-from typing import Any, Dict
-from docxtpl import DocxTemplate
-from agents.registry import get_extractor
-from agents.generate import get_generator
+from typing import TYPE_CHECKING, Any, Dict
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from logging_setup import setup_logging   # 你已有的日志初始化
 
+# pandas / docxtpl / yaml / agents（openai、jinja2）较重，延迟到用到时再导入，
+# 让 --help、参数错误等无需加载即可返回
+if TYPE_CHECKING:
+    import pandas as pd
+
 # ───── 目录常量 ───────────────────────────────────────────
 ROOT       = Path(__file__).parent
 CFG_DIR    = ROOT
@@ -31,12 +35,59 @@ SYS_LOG    = logging.getLogger("system")
 CONFIG_LOG = logging.getLogger("config")
 
 # ───── 实用函数 ───────────────────────────────────────────
+def _check_finite(obj, path: str = "$"):
+    """orjson 会把 NaN / ±Inf 写成 null，读回后类型与 YAML 不一致；遇到即抛 ValueError"""
+    if isinstance(obj, float) and not math.isfinite(obj):
+        raise ValueError(f"{path} 为非有限浮点数 {obj}")
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            _check_finite(v, f"{path}.{k}")
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            _check_finite(v, f"{path}[{i}]")
+
 def load_yaml(cfg_dir: Path, fname: str) -> dict:
-    with open(cfg_dir / "business_configs" / fname, encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    """
+    YAML 仍是唯一的配置源；首次读取后在 business_configs/.cache/ 写一份 JSON（带源文件 mtime + size），
+    之后 YAML 未修改就直接用 orjson 读缓存，省掉 YAML 解析。
+    """
+    src   = cfg_dir / "business_configs" / fname
+    cache = src.parent / ".cache" / (src.stem + ".json")
+    st    = src.stat()
+    mtime, size = st.st_mtime_ns, st.st_size
+    try:
+        blob = orjson.loads(cache.read_bytes())
+        if blob.get("mtime") == mtime and blob.get("size") == size:
+            return blob["data"]
+    except (OSError, orjson.JSONDecodeError, AttributeError, KeyError):
+        pass
+
+    import yaml
+    # 有 libyaml 时用 C 实现的 SafeLoader
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(src, encoding="utf-8") as f:
+        data = yaml.load(f, Loader=loader)
 
-def write_docx(config_dir: Path, report_name: str, render_ctx: dict):
+    try:
+        # 缓存读回的类型必须与 YAML 解析结果一致，否则不写：
+        #   PASSTHROUGH_DATETIME 让 date / datetime 抛 TypeError 而非转成字符串；NaN / ±Inf 由 _check_finite 拦下
+        _check_finite(data)
+        cache.parent.mkdir(exist_ok=True)
+        cache.write_bytes(orjson.dumps({"mtime": mtime, "size": size, "data": data},
+                                       option=orjson.OPT_PASSTHROUGH_DATETIME))
+    except (OSError, TypeError, ValueError) as e:   # 只读目录 / 含日期、非字符串键、非有限浮点数时不缓存
+        CONFIG_LOG.debug(f"[CONFIG] 跳过 JSON 缓存 {fname}：{e}")
+    return data
+
+def load_docx_template(config_dir: Path):
+    """打开模板并解析 docx（与 LLM 调用并行，在后台线程执行）"""
+    from docxtpl import DocxTemplate
     tpl = DocxTemplate(config_dir / "template" / "report_template.docx")
+    tpl.init_docx()
+    return tpl
+
+def write_docx(config_dir: Path, report_name: str, render_ctx: dict, tpl=None):
+    tpl = tpl if tpl is not None else load_docx_template(config_dir)
     tpl.render(render_ctx)
     out_dir = config_dir / "output"
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -51,14 +102,25 @@ def resolve(path: str, data: dict, default: Any | None = None, strict: bool = Tr
     strict=True: 任一层不存在 → 返回 None
     strict=False: 任一层不存在 → 返回 default，并记录一次 warning（由调用方决定）
     """
+    return resolve_parts(tuple(path.split(".")), data, default, strict)
+
+def resolve_parts(parts: tuple[str, ...], data: dict, default: Any | None = None, strict: bool = True):
+    """resolve 的预编译版本：parts 为已拆分的路径，避免循环里反复 split"""
     cur: Any = data
-    for part in path.split("."):
+    for part in parts:
         if isinstance(cur, dict) and part in cur:
             cur = cur[part]
         else:
             return None if strict else default
     return cur
 
+def compile_keys(task: dict) -> dict[str, tuple[str, ...]]:
+    """段落 keys → {原始路径: 拆分后的路径}，每个段落只拆分一次"""
+    keys = task.get("keys") or []
+    if not isinstance(keys, list):   # 预检已提示"将忽略 keys"
+        return {}
+    return {k: tuple(k.split(".")) for k in keys}
+
 # -------- 在嵌套 dict 中确保路径存在并赋值（用于 fill 缺值兜底） --------
 def ensure_path_set(data: dict, path: str, value: Any):
     cur = data
@@ -77,7 +139,20 @@ def first_excel_as_excelfile(dir_path: str | Path, pattern: str = "*.xls*") -> p
         raise FileNotFoundError(f"目录 {dir_path} 下没有找到任何 {pattern} 文件！")
     if len(matches) > 1:
         SYS_LOG.warning(f"发现 {len(matches)} 个 Excel，仅使用第一个：{matches[0].name}")
-    return pd.ExcelFile(matches[0])
+    return open_excel(matches[0])
+
+def open_excel(path: Path) -> pd.ExcelFile:
+    """
+    优先用 calamine 引擎（Rust 实现，解析快、内存低）；
+    未安装 python-calamine 或 pandas 版本过旧时回退到 pandas 默认引擎
+    （xlsx 走 openpyxl，pandas 已按 read_only / data_only 打开）。
+    """
+    import pandas as pd
+    try:
+        return pd.ExcelFile(path, engine="calamine")
+    except (ImportError, ValueError) as e:
+        SYS_LOG.info(f"calamine 引擎不可用（{e}），回退默认引擎")
+        return pd.ExcelFile(path)
 
 # -------- 错误收集器 --------
 class ErrorCollector:
@@ -192,6 +267,9 @@ def validate_configs(config_dir: Path, sheet_cfg: dict, paragraphs: dict, xls: p
         for k, t in keys.items():
             if t not in ("string", "number", "array[string]"):
                 ec.add("warn", "CONFIG", f"sheet {sname}.{k} 非支持类型 {t}，按 string 处理")
+        # batch 分组名（可选）
+        if "batch" in cfg and not isinstance(cfg["batch"], str):
+            ec.add("warn", "CONFIG", f"sheet {sname} 的 batch 不是字符串，将单独抽取")
 
     # 3) Excel sheet 对齐（只提示）
     excel_sheets = set(xls.sheet_names)
@@ -233,6 +311,191 @@ def validate_configs(config_dir: Path, sheet_cfg: dict, paragraphs: dict, xls: p
 
     return planned
 
+# -------- 单个 Sheet 抽取（异步，软失败） --------
+def build_extractor(config_dir: Path, sheet: str, cfg: dict, xls: pd.ExcelFile):
+    from agents.registry import get_extractor
+    df  = xls.parse(sheet, dtype=str)   # 只需文本喂给 LLM，跳过类型推断
+    return get_extractor("GenericExtractor")(
+        df          = df,
+        keys        = cfg["keys"],
+        prompt_path = config_dir / "prompts" / cfg["prompt"],
+        config_dir  = config_dir,
+        provider    = cfg.get("provider", "qwen"),
+        sheet_name  = sheet,
+    )
+
+def clean_extracted(sheet: str, cfg: dict, raw_values: dict) -> dict:
+    # 类型清洗（避免模板里 float/round 爆掉）
+    cleaned = coerce_types(sheet, raw_values, cfg.get("keys", {}), percent_as_fraction=True)
+
+    # 用户摘要
+    kv_line = ", ".join(f"{k}={cleaned[k]}" for k in list(cleaned.keys())[:10])
+    USER_LOG.info(f"[抽取完成] {sheet}：{kv_line}{' ...' if len(cleaned)>10 else ''}")
+    return cleaned
+
+async def extract_sheet(config_dir: Path, sheet: str, cfg: dict, xls: pd.ExcelFile,
+                        ec: ErrorCollector) -> dict | None:
+    """抽取并清洗一个 Sheet；失败记录到 ec 并返回 None"""
+    try:
+        extractor = build_extractor(config_dir, sheet, cfg, xls)
+        SYS_LOG.info(f"开始抽取 Sheet：{sheet}")
+        raw_values = await extractor.aextract() or {}
+        return clean_extracted(sheet, cfg, raw_values)
+
+    except Exception as e:
+        ec.add("error", f"EXTRACT:{sheet}", f"抽取失败：{e}", traceback.format_exc())
+        return None
+
+async def extract_batch(config_dir: Path, sheets: list[str], sheet_cfg: dict, xls: pd.ExcelFile,
+                        ec: ErrorCollector) -> dict[str, dict]:
+    """同一 batch 组的多个 Sheet 合并为一次 LLM 调用；失败时整组记录到 ec 并返回 {}"""
+    from agents.registry import get_extractor
+    try:
+        batch = get_extractor("BatchExtractor")(
+            [build_extractor(config_dir, s, sheet_cfg[s], xls) for s in sheets]
+        )
+        SYS_LOG.info(f"开始批量抽取 Sheet：{', '.join(sheets)}")
+        raw = await batch.aextract()
+        return {s: clean_extracted(s, sheet_cfg[s], raw.get(s) or {}) for s in sheets}
+
+    except Exception as e:
+        for s in sheets:
+            ec.add("error", f"EXTRACT:{s}", f"批量抽取失败：{e}", traceback.format_exc())
+        return {}
+
+def batch_groups(sheets: list[str], sheet_cfg: dict) -> list[list[str]]:
+    """按 (batch, provider) 分组；未配置 batch 或组内只有一个 Sheet 的单独抽取"""
+    groups: dict[tuple, list[str]] = {}
+    for s in sheets:
+        cfg = sheet_cfg[s]
+        b = cfg.get("batch")
+        key = (b, cfg.get("provider", "qwen")) if isinstance(b, str) and b else (None, s)
+        groups.setdefault(key, []).append(s)
+    return list(groups.values())
+
+# -------- 单个段落生成（异步，软失败） --------
+async def generate_paragraph(config_dir: Path, pid: str, task: dict, paths: dict[str, tuple[str, ...]],
+                             extracted: dict, ec: ErrorCollector) -> str | None:
+    """generate 模式：缺字段严格跳过；失败记录到 ec 并返回 None"""
+    from agents.generate import get_generator
+    try:
+        ctx_vals = {k: resolve_parts(parts, extracted, strict=True) for k, parts in paths.items()}
+        missing  = [k for k, v in ctx_vals.items() if v is None]
+        if missing:
+            ec.add("warn", f"PARA:{pid}", f"缺字段 {missing}，已跳过生成")
+            return None
+
+        provider    = task.get("provider", "qwen")
+        prompt_path = config_dir / "prompts" / task["prompt"]
+
+        # 记录用于生成的关键上下文
+        CONFIG_LOG.debug(f"[GEN-VALUES] {pid}\n{json.dumps(ctx_vals, ensure_ascii=False, indent=2)}")
+
+        generator = get_generator("GenericParagraphGenerator")(
+            prompt_path = prompt_path,
+            context     = extracted,   # 模板里可 {{ Sheet.Field }}（仅限 keys 中声明的 Sheet）
+            config_dir  = config_dir,
+            provider    = provider,
+            paragraph_id= pid,
+        )
+        text = await generator.agenerate()
+        USER_LOG.info(f"[生成完成] {pid}：{(text[:200] + '...') if len(text)>200 else text}")
+        return text
+
+    except Exception as e:
+        ec.add("error", f"PARA:{pid}", f"处理失败（mode=generate）：{e}", traceback.format_exc())
+        return None
+
+# -------- 直填变量（同步，宽松） --------
+def fill_paragraph(pid: str, paths: dict[str, tuple[str, ...]], extracted: dict, ec: ErrorCollector):
+    """fill 模式：即便缺 key 也不终止；为缺失路径补默认值，避免模板渲染报错"""
+    try:
+        missing = [k for k, parts in paths.items() if resolve_parts(parts, extracted, strict=True) is None]
+        for miss in missing:
+            ensure_path_set(extracted, miss, "-")
+            ec.add("warn", f"FILL:{pid}", f"缺字段 {miss}，已用默认 '-' 补位")
+
+        # 记录 fill 的实际值
+        if paths:
+            val_map = {k: resolve_parts(parts, extracted, strict=False, default="-") for k, parts in paths.items()}
+            CONFIG_LOG.debug(f"[FILL-VALUES] pid={pid}\n{json.dumps(val_map, ensure_ascii=False, indent=2)}")
+            summary = ", ".join(f"{k}={val_map[k]}" for k in val_map)
+            USER_LOG.info(f"[直填值] {pid} → {summary[:500] + ' ...' if len(summary)>500 else summary}")
+        else:
+            SYS_LOG.info(f"[直填变量] {pid}（未声明 keys，跳过值记录）")
+
+    except Exception as e:
+        ec.add("error", f"PARA:{pid}", f"处理失败（mode=fill）：{e}", traceback.format_exc())
+
+# -------- 抽取 + 生成（按依赖调度的 DAG） --------
+def sheet_deps(paths: dict[str, tuple[str, ...]], sheets) -> set[str]:
+    """段落依赖的 Sheet：keys 的首段（Sheet.Field → Sheet）；未声明 keys 时依赖全部 Sheet"""
+    if not paths:
+        return set(sheets)
+    return {parts[0] for parts in paths.values()} & set(sheets)
+
+async def main_pipeline(config_dir: Path, sheets: list[str], sheet_cfg: dict, paragraphs: dict,
+                        planned: dict, xls: pd.ExcelFile,
+                        ec: ErrorCollector) -> tuple[dict, dict]:
+    """
+    每个 Sheet 抽取是一个 Task；每个 generate 段落只等待自己依赖的 Sheet，
+    依赖就绪即开始生成，端到端耗时 ≈ DAG 上最长的一条路径。
+    返回 (extracted, gen_ctx)
+    """
+    extracted: dict[str, dict] = {}
+
+    # 4) 抽取变量（嵌套命名空间：{Sheet: {field: val}}）
+    async def _extract(group: list[str]):
+        if len(group) > 1:
+            extracted.update(await extract_batch(config_dir, group, sheet_cfg, xls, ec))
+            return
+        cleaned = await extract_sheet(config_dir, group[0], sheet_cfg[group[0]], xls, ec)
+        if cleaned is not None:
+            extracted[group[0]] = cleaned
+
+    # 同一 batch 组的 Sheet 共用一个 Task
+    extract_futs: dict[str, asyncio.Task] = {}
+    for group in batch_groups(sheets, sheet_cfg):
+        fut = asyncio.create_task(_extract(group))
+        extract_futs.update({s: fut for s in group})
+
+    # 5) 处理段落：generate 等依赖就绪后并发调用 LLM；fill 在全部完成后补默认值，不影响生成上下文
+    async def _generate(pid: str, task: dict, paths: dict) -> str | None:
+        needed = sheet_deps(paths, extract_futs)
+        await asyncio.gather(*(extract_futs[s] for s in needed))
+        # 只给生成器依赖 Sheet 的快照：其他 Sheet 仍在并发写入 extracted，
+        # 直接传入会让 prompt 渲染结果（以及缓存键）随完成时序变化
+        snapshot = {s: extracted[s] for s in needed if s in extracted}
+        return await generate_paragraph(config_dir, pid, task, paths, snapshot, ec)
+
+    gen_futs: dict[str, asyncio.Task] = {}
+    fill_tasks: dict[str, dict] = {}   # pid → 预编译的 keys 路径
+    for pid, task in (paragraphs or {}).items():
+        if pid in planned["paragraphs"]:
+            SYS_LOG.warning(f"跳过存在问题的段落/占位符：{pid}")
+            continue
+        mode  = task.get("mode") or ("generate" if "prompt" in task else "fill")
+        paths = compile_keys(task)
+        if mode == "generate":
+            gen_futs[pid] = asyncio.create_task(_generate(pid, task, paths))
+        else:
+            fill_tasks[pid] = paths
+
+    try:
+        await asyncio.gather(*set(extract_futs.values()))
+        outs = await asyncio.gather(*gen_futs.values())
+    finally:
+        from llm_client import close_clients
+        await close_clients()   # 所有 LLM 调用已结束，释放共享连接池
+    gen_ctx: dict[str, str] = {pid: text for pid, text in zip(gen_futs, outs) if text is not None}
+
+    # 渲染上下文保持 Sheet 的原始顺序（而非完成顺序）
+    extracted = {s: extracted[s] for s in sheets if s in extracted}
+    for pid, paths in fill_tasks.items():
+        fill_paragraph(pid, paths, extracted, ec)
+
+    return extracted, gen_ctx
+
 # ───── Pipeline ─────────────────────────────────────────
 def run_pipeline(config_dir: str, report_name: str):
     config_dir = Path(config_dir)
@@ -264,8 +527,8 @@ def run_pipeline(config_dir: str, report_name: str):
     # 3) 预检（只产生日志与 planned_skips）
     planned = validate_configs(config_dir, sheet_cfg, paragraphs, xls, ec)
 
-    # 4) 抽取变量（嵌套命名空间：{Sheet: {field: val}}）
-    extracted: dict[str, dict] = {}
+    # 4) ~ 5) 选出待抽取的 Sheet，交给 main_pipeline 并发抽取 / 生成
+    todo: list[str] = []
     for sheet in xls.sheet_names:
         if sheet not in sheet_cfg:
             SYS_LOG.info(f"跳过未配置的 Sheet：{sheet}")
@@ -273,99 +536,25 @@ def run_pipeline(config_dir: str, report_name: str):
         if sheet in planned["sheets"]:
             SYS_LOG.warning(f"跳过存在问题的 Sheet：{sheet}")
             continue
+        todo.append(sheet)
 
-        cfg = sheet_cfg[sheet]
-        try:
-            df  = xls.parse(sheet)
-            SYS_LOG.info(f"开始抽取 Sheet：{sheet}")
-
-            extractor = get_extractor("GenericExtractor")(
-                df          = df,
-                keys        = cfg["keys"],
-                prompt_path = config_dir / "prompts" / cfg["prompt"],
-                config_dir  = config_dir,
-                provider    = cfg.get("provider", "qwen"),
-                sheet_name  = sheet,
-            )
-            raw_values = extractor.extract() or {}
-
-            # 类型清洗（避免模板里 float/round 爆掉）
-            cleaned = coerce_types(sheet, raw_values, cfg.get("keys", {}), percent_as_fraction=True)
-            extracted[sheet] = cleaned
-
-            # 用户摘要
-            kv_line = ", ".join(f"{k}={cleaned[k]}" for k in list(cleaned.keys())[:10])
-            USER_LOG.info(f"[抽取完成] {sheet}：{kv_line}{' ...' if len(cleaned)>10 else ''}")
-
-        except Exception as e:
-            ec.add("error", f"EXTRACT:{sheet}", f"抽取失败：{e}", traceback.format_exc())
-            continue
-
-    # 5) 处理段落：支持 generate / fill 双模式
-    gen_ctx: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # 模板加载（docxtpl 导入 + docx 解析）与 LLM 调用并行，不占关键路径
+        tpl_fut = pool.submit(load_docx_template, config_dir)
 
-    for pid, task in (paragraphs or {}).items():
-        if pid in planned["paragraphs"]:
-            SYS_LOG.warning(f"跳过存在问题的段落/占位符：{pid}")
-            continue
-
-        mode = task.get("mode") or ("generate" if "prompt" in task else "fill")
-        keys = task.get("keys", [])
+        extracted, gen_ctx = asyncio.run(
+            main_pipeline(config_dir, todo, sheet_cfg, paragraphs, planned, xls, ec)
+        )
 
+        # 6) 渲染 Word（硬失败：模板缺失会在这里炸）
         try:
-            # 缺 key 检查：generate 严格，fill 宽松（继续并补默认）
-            missing = [k for k in (keys or []) if resolve(k, extracted, strict=True) is None]
-            if missing and mode == "generate":
-                ec.add("warn", f"PARA:{pid}", f"缺字段 {missing}，已跳过生成")
-                continue
-
-            if mode == "generate":
-                provider    = task.get("provider", "qwen")
-                prompt_path = config_dir / "prompts" / task["prompt"]
-
-                # 记录用于生成的关键上下文
-                ctx_vals = {k: resolve(k, extracted, strict=True) for k in keys or []}
-                CONFIG_LOG.debug(f"[GEN-VALUES] {pid}\n{json.dumps(ctx_vals, ensure_ascii=False, indent=2)}")
-
-                generator = get_generator("GenericParagraphGenerator")(
-                    prompt_path = prompt_path,
-                    context     = extracted,   # 模板里可 {{ Sheet.Field }}
-                    config_dir  = config_dir,
-                    provider    = provider,
-                    paragraph_id= pid,
-                )
-                text = generator.generate()
-                gen_ctx[pid] = text
-                USER_LOG.info(f"[生成完成] {pid}：{(text[:200] + '...') if len(text)>200 else text}")
-
-            else:  # fill
-                # 宽松：即便缺 key 也不终止；为缺失路径补默认值，避免模板渲染报错
-                for miss in missing:
-                    ensure_path_set(extracted, miss, "-")
-                    ec.add("warn", f"FILL:{pid}", f"缺字段 {miss}，已用默认 '-' 补位")
-
-                # 记录 fill 的实际值
-                if keys:
-                    val_map = {k: resolve(k, extracted, strict=False, default="-") for k in keys}
-                    CONFIG_LOG.debug(f"[FILL-VALUES] pid={pid}\n{json.dumps(val_map, ensure_ascii=False, indent=2)}")
-                    summary = ", ".join(f"{k}={val_map[k]}" for k in val_map)
-                    USER_LOG.info(f"[直填值] {pid} → {summary[:500] + ' ...' if len(summary)>500 else summary}")
-                else:
-                    SYS_LOG.info(f"[直填变量] {pid}（未声明 keys，跳过值记录）")
-
+            # 注意：若占位符名与 Sheet 名冲突，生成型段落优先
+            render_ctx = {**extracted, **gen_ctx}
+            CONFIG_LOG.debug(f"[RENDER-CTX] keys={list(render_ctx.keys())}")
+            write_docx(config_dir, report_name, render_ctx, tpl=tpl_fut.result())
+            SYS_LOG.info("流水线结束")
         except Exception as e:
-            ec.add("error", f"PARA:{pid}", f"处理失败（mode={mode}）：{e}", traceback.format_exc())
-            continue
-
-    # 6) 渲染 Word（硬失败：模板缺失会在这里炸）
-    try:
-        # 注意：若占位符名与 Sheet 名冲突，生成型段落优先
-        render_ctx = {**extracted, **gen_ctx}
-        CONFIG_LOG.debug(f"[RENDER-CTX] keys={list(render_ctx.keys())}")
-        write_docx(config_dir, report_name, render_ctx)
-        SYS_LOG.info("流水线结束")
-    except Exception as e:
-        ec.add("error", "RENDER", f"渲染失败：{e}", traceback.format_exc())
+            ec.add("error", "RENDER", f"渲染失败：{e}", traceback.format_exc())
 
     # 7) 写运行摘要
     ec.dump(ROOT)
@@ -375,14 +564,14 @@ def run_pipeline(config_dir: str, report_name: str):
 
 # ───── CLI ──────────────────────────────────────────────
 if __name__ == "__main__":
-    if "DASHSCOPE_API_KEY" not in os.environ:
-        logging.getLogger("system").error("缺少 DASHSCOPE_API_KEY 环境变量")
-        sys.exit("✗ 请先 set DASHSCOPE_API_KEY=sk-...")
-
     import argparse
     ap = argparse.ArgumentParser(description="自动生成报告流水线")
     ap.add_argument("-c", "--config", default="configs", help="配置文件目录")
     ap.add_argument("-n", "--name", default="生成报告文件", help="报告名称")
     args = ap.parse_args()
 
+    if "DASHSCOPE_API_KEY" not in os.environ:
+        logging.getLogger("system").error("缺少 DASHSCOPE_API_KEY 环境变量")
+        sys.exit("✗ 请先 set DASHSCOPE_API_KEY=sk-...")
+
     run_pipeline(args.config, args.name)